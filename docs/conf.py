@@ -30,10 +30,13 @@ author = 'Quentin Febvre'
 copyright = f'{datetime.now().year}, {author}'
 
 # The full version, including alpha/beta/rc tags
-# Attempt to get version from the package itself
+# Read it from the installed distribution metadata so the package (and its heavy
+# dependencies) is not imported just to get the version string
 try:
-    from zendag import __version__ as release
-except ImportError:
+    from importlib.metadata import PackageNotFoundError, version as _pkg_version
+
+    release = _pkg_version('zendag')
+except PackageNotFoundError:
     release = '0.1.1' # Fallback version
 
 version = '.'.join(release.split('.')[:2]) # The short X.Y version
@@ -81,6 +84,12 @@ myst_footnote_transition = True
 nb_execution_mode = "cache" # Good for CI speed, "force" for ensuring all run
 nb_execution_timeout = 180  # Seconds, increase if notebooks are long-running
 nb_execution_allow_errors = False # Fail the build if a notebook cell errors
+nb_execution_in_temp = False # Execute in the notebook's own directory
+# Persistent jupyter-cache location so executed outputs survive between builds
+# (CI restores this directory, see .github/workflows/zendag-package-ci.yml)
+nb_execution_cache_path = os.environ.get(
+    'JUPYTER_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jupyter_cache')
+)
 # nb_kernel_rgx_aliases = {".*python.*": "python3"} # If needed to map kernel names
 
 # Napoleon settings (for Google/NumPy docstrings)
@@ -108,7 +117,9 @@ autodoc_default_options = {
     'undoc-members': False, # Set to True to include members without docstrings
     'show-inheritance': True,
 }
-# autosummary_generate = True # Creates .rst files for autosummary
+# Heavy runtime-only dependencies are mocked so autodoc does not pay their import cost
+autodoc_mock_imports = ['mlflow']
+autosummary_generate = True # Creates .rst files for autosummary
 # autosummary_imported_members = True
 
 # sphinx-autodoc-typehints settings
@@ -5,6 +5,22 @@ from pathlib import Path
 import hydra
 import hydra_zen
 import pytest
+import yaml
+
+# --- RAM-backed temporary directories ---
+_TMPFS_ROOT = Path("/dev/shm")
+
+
+def pytest_configure(config):
+    """Opt-in: with ZENDAG_TEST_TMPFS=1, place tmp_path under tmpfs so the file-heavy tests avoid disk I/O.
+
+    An explicit `--basetemp` always wins. Like any explicit basetemp, the directory is
+    cleared at the start of the next run, so tmp dirs of failing tests can be inspected.
+    """
+    if os.environ.get("ZENDAG_TEST_TMPFS") != "1" or config.option.basetemp is not None:
+        return
+    if _TMPFS_ROOT.is_dir() and os.access(_TMPFS_ROOT, os.W_OK):
+        config.option.basetemp = str(_TMPFS_ROOT / "pytest-zendag")
 
 
 # --- Fixtures for Temporary Directories ---
@@ -60,6 +76,16 @@ def create_dummy_hydra_config_content(
     return "\n".join(content_parts)
 
 
+# --- Helper for reading back generated YAML files ---
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml_file(path):
+    # Binary mode: libyaml consumes the bytes directly, no text decoding step
+    with open(path, "rb") as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
 # --- Custom Project Directory Functions for Testing ---
 def fixture_project_stage_dir_fn(temp_artifacts_dir: Path):
     def fn(stage: str | None, name: str) -> str:
@@ -75,11 +101,25 @@ def fixture_project_configs_dir_fn(temp_artifacts_dir: Path):
     return fn
 
 
-@pytest.fixture(autouse=True)  # autouse=True will apply this to all tests by default
+@pytest.fixture
+def pipeline_kwargs(zen_store, temp_artifacts_dir: Path):
+    """configure_pipeline arguments for the `data_prep` stage group of `zen_store`, laid out under temp_artifacts_dir."""
+    return {
+        "store": zen_store,
+        "stage_groups": ["data_prep"],
+        "stage_dir_fn": fixture_project_stage_dir_fn(temp_artifacts_dir),
+        "configs_dir_fn": fixture_project_configs_dir_fn(temp_artifacts_dir),
+    }
+
+
+@pytest.fixture
 def hydra_global_state_cleanup():
     """
     Ensures Hydra's global state is clean before and after each test
     if it was initialized.
+
+    Opt-in: modules whose tests initialize Hydra request it through
+    `pytestmark = pytest.mark.usefixtures("hydra_global_state_cleanup")`.
     """
     # Before the test:
     # Optional: Could clear here if a previous non-test interaction left it initialized,
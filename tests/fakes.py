@@ -0,0 +1,33 @@
+# tests/fakes.py
+"""Lightweight in-memory stand-in for MLflow used by the mlflow_run tests."""
+
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class FakeMlflow:
+    """Records the MLflow calls made by `mlflow_run` in plain lists/dicts."""
+
+    experiments: List[str] = field(default_factory=list)
+    runs: List[Dict[str, Any]] = field(default_factory=list)
+    params: Dict[str, Any] = field(default_factory=dict)
+    param_batches: List[Dict[str, Any]] = field(default_factory=list)
+    artifacts: List[str] = field(default_factory=list)
+
+    def set_experiment(self, name: str) -> None:
+        self.experiments.append(name)
+
+    @contextmanager
+    def start_run(self, run_id: Optional[str] = None, run_name: Optional[str] = None, nested: bool = False):
+        self.runs.append({"run_id": run_id, "run_name": run_name, "nested": nested})
+        yield SimpleNamespace(info=SimpleNamespace(run_id=run_id or f"fake_run_id_{len(self.runs)}"))
+
+    def log_params(self, params: Dict[str, Any]) -> None:
+        self.param_batches.append(dict(params))
+        self.params.update(params)
+
+    def log_artifact(self, local_path: str, artifact_path: Optional[str] = None) -> None:
+        self.artifacts.append(local_path)
@@ -1,7 +1,10 @@
 # tests/test_config_utils.py
 
+from dataclasses import dataclass
+
 import pytest
 
+from zendag import core
 from zendag.config_utils import deps_path, outs_path
 
 
@@ -25,3 +28,22 @@ def test_deps_path_with_stage_and_name():
 def test_deps_path_missing_input_name():
     with pytest.raises(ValueError, match="input_name must be specified"):
         deps_path("input.txt", input_stage="prev_stage", stage_dir_fn=lambda s, n: "")
+
+
+def test_deps_path_follows_artifacts_root(monkeypatch):
+    # default_stage_dir_fn reads ARTIFACTS_ROOT when called
+    monkeypatch.setattr(core, "ARTIFACTS_ROOT", "r")
+    assert deps_path("x.csv", "prep", "a") == "${deps:r/prep/a/x.csv,True}"
+    monkeypatch.setattr(core, "ARTIFACTS_ROOT", "elsewhere")
+    assert deps_path("x.csv", "prep", "a") == "${deps:elsewhere/prep/a/x.csv,True}"
+
+
+def test_deps_path_unhashable_stage_dir_fn():
+    @dataclass
+    class StageDirFn:
+        root: str
+
+        def __call__(self, stage, name):
+            return f"{self.root}/{stage}/{name}"
+
+    assert deps_path("x.csv", "prep", "a", stage_dir_fn=StageDirFn("r")) == "${deps:r/prep/a/x.csv,True}"
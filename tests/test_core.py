@@ -1,22 +1,28 @@
 # tests/test_core.py
+import os
+import subprocess
+import sys
 from pathlib import Path
 
 import hydra  # For hydra.initialize if needed, though configure_pipeline does it
 import hydra_zen
 import omegaconf
 import pytest
-import yaml  # For parsing dvc.yaml
+from hydra.core.config_store import ConfigStore
 from omegaconf import OmegaConf
 
-from zendag.core import (
-    configure_pipeline,
-)
+import zendag.core
+from zendag.core import configure_pipeline
 
 from .conftest import (
     fixture_project_configs_dir_fn,
     fixture_project_stage_dir_fn,
+    load_yaml_file,
 )
 
+# configure_pipeline initializes Hydra, make sure it is torn down after each test
+pytestmark = pytest.mark.usefixtures("hydra_global_state_cleanup")
+
 
 # A dummy target function for hydra-zen builds
 def dummy_stage_function(output_path: str, input_path: str = None, some_param: int = 0):
@@ -53,7 +59,6 @@ def test_configure_pipeline_single_stage_no_deps(
         dummy_stage_function,
         output_path=f"${{outs:{output_file}}}",  # Using the string directly for ZenBuildsConf
         some_param=10,
-        populate_full_signature=True,  # Ensure all args are in the config
     )
     # Add to store (mimicking user's configure.py)
     stage_store = zen_store(group=stage_name)
@@ -88,8 +93,7 @@ def test_configure_pipeline_single_stage_no_deps(
     # 2. Check dvc.yaml was written
     dvc_file_path = temp_cwd / "dvc_test.yaml"
     assert dvc_file_path.exists()
-    with open(dvc_file_path, "r") as f:
-        dvc_data = yaml.safe_load(f)
+    dvc_data = load_yaml_file(dvc_file_path)
 
     # 3. Check dvc.yaml content
     dvc_stage_key = f"{stage_name}/{config_name}"
@@ -121,7 +125,6 @@ def test_configure_pipeline_with_inter_stage_deps(
     GenDataConfig = hydra_zen.builds(
         dummy_stage_function,
         output_path=f"${{outs:{stage1_output}}}",
-        populate_full_signature=True,
     )
     zen_store(group=stage1_name)(GenDataConfig, name=config1_name)
 
@@ -142,7 +145,6 @@ def test_configure_pipeline_with_inter_stage_deps(
         input_path=f"${{deps:{stage_dir_func(stage1_name, config1_name)}/{stage1_output},True}}",
         output_path=f"${{outs:{stage2_output}}}",
         some_param=22,
-        populate_full_signature=True,
     )
     zen_store(group=stage2_name)(ProcessDataConfig, name=config2_name)
 
@@ -160,8 +162,7 @@ def test_configure_pipeline_with_inter_stage_deps(
     # --- Assertions ---
     dvc_file_path = temp_cwd / "dvc_deps_test.yaml"
     assert dvc_file_path.exists()
-    with open(dvc_file_path, "r") as f:
-        dvc_data = yaml.safe_load(f)
+    dvc_data = load_yaml_file(dvc_file_path)
 
     # Check stage 2 (process_data)
     dvc_stage2_key = f"{stage2_name}/{config2_name}"
@@ -190,25 +191,27 @@ def test_configure_pipeline_empty_stage_group(
     zen_store: hydra_zen.ZenStore,
     caplog,  # To capture log messages
 ):
-    caplog.set_level("WARNING")
+    caplog.set_level("WARNING", logger="zendag.core")
     configure_pipeline(
         store=zen_store,  # Empty store for this group
         stage_groups=["non_existent_stage"],
         stage_dir_fn=fixture_project_stage_dir_fn(temp_artifacts_dir),
         configs_dir_fn=fixture_project_configs_dir_fn(temp_artifacts_dir),
     )
-    assert "No configurations found in store for stage group: 'non_existent_stage'" in caplog.text
+    assert any(
+        "No configurations found in store for stage group: 'non_existent_stage'" in r.getMessage()
+        for r in caplog.records
+    )
     dvc_file = temp_cwd / "dvc.yaml"  # Default name
     assert dvc_file.exists()  # Should still create an empty dvc.yaml
-    with open(dvc_file, "r") as f:
-        dvc_data = yaml.safe_load(f)
+    dvc_data = load_yaml_file(dvc_file)
     assert dvc_data["stages"] == {}
 
 
 def test_configure_pipeline_config_resolution_failure(
     temp_cwd: Path, temp_artifacts_dir: Path, zen_store: hydra_zen.ZenStore, caplog
 ):
-    caplog.set_level("ERROR")
+    caplog.set_level("ERROR", logger="zendag.core")
     stage_name = "failing_stage"
     config_name = "bad_config"
 
@@ -229,4 +232,244 @@ def test_configure_pipeline_config_resolution_failure(
             configs_dir_fn=fixture_project_configs_dir_fn(temp_artifacts_dir),
         )
 
-    assert " Failed add store configurations to hydra" in caplog.text
+    assert any(" Failed add store configurations to hydra" in r.getMessage() for r in caplog.records)
+
+
+def test_configure_pipeline_reuses_cached_resolution(
+    temp_cwd: Path,
+    zen_store: hydra_zen.ZenStore,
+    monkeypatch,
+    pipeline_kwargs,
+):
+    stage_name = "data_prep"
+    config_name = "cached"
+    ProcessConfig = hydra_zen.builds(
+        dummy_stage_function,
+        output_path="${outs:cached.csv}",
+    )
+    zen_store(group=stage_name)(ProcessConfig, name=config_name)
+
+    configure_pipeline(**pipeline_kwargs, compose_cache=False)
+    first_dvc = (temp_cwd / "dvc.yaml").read_text()
+
+    resolve_calls = []
+    original_to_container = OmegaConf.to_container
+    monkeypatch.setattr(
+        OmegaConf,
+        "to_container",
+        lambda cfg, **kw: (kw.get("resolve") and resolve_calls.append(cfg)) or original_to_container(cfg, **kw),
+    )
+    configure_pipeline(**pipeline_kwargs, compose_cache=False)
+
+    assert resolve_calls == []
+    assert (temp_cwd / "dvc.yaml").read_text() == first_dvc
+
+
+def test_configure_pipeline_cached_resolution_tracks_interpolated_root_nodes(
+    temp_cwd: Path, zen_store: hydra_zen.ZenStore, pipeline_kwargs
+):
+    # The stage interpolates a node placed outside its own subtree
+    cs = ConfigStore.instance()
+    stage_name = "data_prep"
+    zen_store(group=stage_name)(
+        hydra_zen.make_config(hydra_defaults=["_self_", {"/model@_global_.model": "m"}], lr="${model.lr}"),
+        name="a",
+    )
+    try:
+        cs.store(group="model", name="m", node={"lr": 1})
+        composed_config_path = configure_pipeline(**pipeline_kwargs, compose_cache=False)[f"{stage_name}/a"]
+        assert OmegaConf.load(composed_config_path).lr == 1
+
+        cs.store(group="model", name="m", node={"lr": 2})
+        configure_pipeline(**pipeline_kwargs, compose_cache=False)
+        assert OmegaConf.load(composed_config_path).lr == 2
+    finally:
+        cs.repo.pop("model", None)
+
+
+def test_configure_pipeline_reuses_initialized_hydra(
+    temp_cwd: Path,
+    temp_artifacts_dir: Path,
+    zen_store: hydra_zen.ZenStore,
+    setup_hydra_for_compose,
+):
+    stage_name = "data_prep"
+    config_name = "reuse_hydra"
+    zen_store(group=stage_name)(
+        hydra_zen.builds(dummy_stage_function, output_path="${outs:out.csv}"),
+        name=config_name,
+    )
+    global_hydra = hydra.core.global_hydra.GlobalHydra.instance()
+    config_loader = global_hydra.config_loader()
+
+    configure_pipeline(
+        store=zen_store,
+        stage_groups=[stage_name],
+        stage_dir_fn=fixture_project_stage_dir_fn(temp_artifacts_dir),
+        configs_dir_fn=fixture_project_configs_dir_fn(temp_artifacts_dir),
+    )
+
+    # The caller's Hydra instance was used as-is and left initialized
+    assert global_hydra.is_initialized()
+    assert global_hydra.config_loader() is config_loader
+    assert (temp_artifacts_dir / stage_name / f"{config_name}.yaml").exists()
+
+
+def test_configure_pipeline_drops_stage_when_config_write_fails(
+    temp_cwd: Path, temp_artifacts_dir: Path, zen_store: hydra_zen.ZenStore, caplog
+):
+    caplog.set_level("ERROR", logger="zendag.core")
+    stage_name = "data_prep"
+    for config_name in ["ok", "unwritable"]:
+        zen_store(group=stage_name)(
+            hydra_zen.builds(dummy_stage_function, output_path=f"${{outs:{config_name}.csv}}"),
+            name=config_name,
+        )
+    # A directory in place of the composed config file makes its write fail
+    (temp_artifacts_dir / stage_name / "unwritable.yaml").mkdir(parents=True)
+
+    stage_config_paths = configure_pipeline(
+        store=zen_store,
+        stage_groups=[stage_name],
+        stage_dir_fn=fixture_project_stage_dir_fn(temp_artifacts_dir),
+        configs_dir_fn=fixture_project_configs_dir_fn(temp_artifacts_dir),
+    )
+
+    assert list(stage_config_paths) == [f"{stage_name}/ok"]
+    assert list(load_yaml_file(temp_cwd / "dvc.yaml")["stages"]) == [f"{stage_name}/ok"]
+    assert any("Failed to write composed configuration" in r.getMessage() for r in caplog.records)
+
+
+def test_configure_pipeline_reuses_persisted_composition(
+    temp_cwd: Path,
+    temp_artifacts_dir: Path,
+    zen_store: hydra_zen.ZenStore,
+    monkeypatch,
+    pipeline_kwargs,
+):
+    stage_name = "data_prep"
+    zen_store(group=stage_name)(hydra_zen.builds(dummy_stage_function, output_path="${outs:a.csv}"), name="a")
+    zen_store(group=stage_name)(hydra_zen.builds(dummy_stage_function, output_path="${outs:b.csv}"), name="b")
+    configure_pipeline(**pipeline_kwargs)
+    first_dvc = (temp_cwd / "dvc.yaml").read_text()
+
+    # A fresh process: only the entries persisted under the working directory are left
+    monkeypatch.setattr(zendag.core, "_RESOLUTION_CACHE", {})
+    compose_calls = []
+    original_compose = hydra.compose
+    monkeypatch.setattr(hydra, "compose", lambda *a, **kw: compose_calls.append(kw) or original_compose(*a, **kw))
+    configure_pipeline(**pipeline_kwargs)
+
+    assert compose_calls == []
+    assert (temp_cwd / "dvc.yaml").read_text() == first_dvc
+
+    # Any store change invalidates the persisted compositions (entries can pull each other in)
+    zen_store.delete_entry(stage_name, "b")
+    zen_store(group=stage_name)(hydra_zen.builds(dummy_stage_function, output_path="${outs:b2.csv}"), name="b")
+    configure_pipeline(**pipeline_kwargs)
+
+    assert len(compose_calls) == 2
+    assert load_yaml_file(temp_cwd / "dvc.yaml")["stages"][f"{stage_name}/b"]["outs"] == [f"{stage_name}/b/b2.csv"]
+    # Each stage instance keeps a single entry, overwritten when its key changes
+    assert len(list((temp_artifacts_dir / ".zendag_cache").glob("*.json"))) == 2
+    # The cache stays out of git in projects committing wdir
+    assert (temp_artifacts_dir / ".zendag_cache" / ".gitignore").read_text().splitlines()[-1] == "*"
+
+    configure_pipeline(**pipeline_kwargs, compose_cache=False)
+    assert len(compose_calls) == 4
+
+
+def test_configure_pipeline_persists_only_fresh_resolutions(
+    temp_cwd: Path, temp_artifacts_dir: Path, zen_store: hydra_zen.ZenStore, pipeline_kwargs
+):
+    stage_name = "data_prep"
+    zen_store(group=stage_name)(hydra_zen.builds(dummy_stage_function, output_path="${outs:a.csv}"), name="a")
+    configure_pipeline(**pipeline_kwargs, compose_cache=False)
+
+    # Served from the in-process resolution cache: not written to disk
+    configure_pipeline(**pipeline_kwargs)
+    assert not list(temp_artifacts_dir.glob(".zendag_cache/*.json"))
+
+
+def test_configure_pipeline_persisted_composition_tracks_config_store(
+    temp_cwd: Path, zen_store: hydra_zen.ZenStore, pipeline_kwargs
+):
+    # Nodes stored in Hydra's ConfigStore directly, outside the store passed in, are part of the cache key
+    cs = ConfigStore.instance()
+    stage_name = "data_prep"
+    zen_store(group=stage_name)(
+        hydra_zen.make_config(hydra_defaults=["_self_", {"/model@model": "m"}], model=None, out="${outs:a.csv}"),
+        name="a",
+    )
+    try:
+        cs.store(group="model", name="m", node={"lr": 1})
+        composed_config_path = configure_pipeline(**pipeline_kwargs)[f"{stage_name}/a"]
+        assert OmegaConf.load(composed_config_path).model.lr == 1
+
+        cs.store(group="model", name="m", node={"lr": 2})
+        configure_pipeline(**pipeline_kwargs)
+        assert OmegaConf.load(composed_config_path).model.lr == 2
+    finally:
+        cs.repo.pop("model", None)
+
+
+def test_configure_pipeline_keeps_unchanged_composed_configs(
+    temp_cwd: Path, zen_store: hydra_zen.ZenStore, pipeline_kwargs
+):
+    stage_name = "data_prep"
+    zen_store(group=stage_name)(hydra_zen.builds(dummy_stage_function, output_path="${outs:a.csv}"), name="a")
+    composed_config_path = configure_pipeline(**pipeline_kwargs)[f"{stage_name}/a"]
+    os.utime(composed_config_path, ns=(1, 1))
+
+    configure_pipeline(**pipeline_kwargs)
+    assert os.stat(composed_config_path).st_mtime_ns == 1
+
+    # A stale file is rewritten
+    composed_config_path.write_text("stale: true\n")
+    configure_pipeline(**pipeline_kwargs)
+    assert "stale" not in composed_config_path.read_text()
+
+
+@pytest.mark.parametrize("omegaconf_dumper", [True, False], ids=["omegaconf_dumper", "public_api_fallback"])
+def test_configure_pipeline_composed_config_round_trips(
+    temp_cwd: Path, temp_artifacts_dir: Path, zen_store: hydra_zen.ZenStore, monkeypatch, omegaconf_dumper
+):
+    if not omegaconf_dumper:
+        monkeypatch.setattr(zendag.core, "get_omega_conf_dumper", None)
+    stage_name = "data_prep"
+    zen_store(group=stage_name)(
+        {"tag": "1e-3", "ver": "1e5", "label": "café", "out": "${outs:a.csv}"},
+        name="a",
+    )
+    composed_config_path = configure_pipeline(
+        store=zen_store,
+        stage_groups=[stage_name],
+        stage_dir_fn=fixture_project_stage_dir_fn(temp_artifacts_dir),
+        configs_dir_fn=fixture_project_configs_dir_fn(temp_artifacts_dir),
+    )[f"{stage_name}/a"]
+
+    # Float-looking strings stay strings for OmegaConf's loader, as used by Hydra in zendag.run
+    assert "café" in composed_config_path.read_text(encoding="utf-8")
+    composed_cfg = OmegaConf.load(composed_config_path)
+    assert composed_cfg.tag == "1e-3"
+    assert composed_cfg.ver == "1e5"
+    assert composed_cfg.label == "café"
+
+
+def test_package_exposes_submodules():
+    # Run in a fresh interpreter: here zendag.core is already imported by this module
+    code = "import zendag; zendag.core.configure_pipeline; zendag.config_utils.deps_path"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_configure_pipeline_replaces_stale_projroot_link(
+    temp_cwd: Path, temp_artifacts_dir: Path, zen_store: hydra_zen.ZenStore
+):
+    wdir = Path("workbench")
+    wdir.mkdir()
+    os.symlink("../missing", wdir / "projroot", target_is_directory=True)  # Dangling link
+
+    configure_pipeline(store=zen_store, stage_groups=[], wdir=str(wdir))
+
+    assert os.readlink(wdir / "projroot") == ".."
+    assert (wdir / "projroot").resolve() == temp_cwd.resolve()
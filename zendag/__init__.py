@@ -1,8 +1,16 @@
 __version__ = "0.1.5"
 
-from .config_utils import deps_path, outs_path
-from .core import configure_pipeline, default_configs_dir_fn, default_stage_dir_fn
-from .mlflow_utils import mlflow_run
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .config_utils import deps_path, outs_path
+    from .core import (
+        configure_pipeline,
+        default_configs_dir_fn,
+        default_stage_dir_fn,
+    )
+    from .mlflow_utils import mlflow_run
 
 __all__ = [
     "configure_pipeline",
@@ -12,3 +20,33 @@ __all__ = [
     "deps_path",
     "outs_path",
 ]
+
+# Public names and the submodule defining them. Submodules pull in hydra/omegaconf
+# (and mlflow for mlflow_run), so they are only imported on first attribute access.
+_LAZY_ATTRS = {
+    "configure_pipeline": ".core",
+    "default_stage_dir_fn": ".core",
+    "default_configs_dir_fn": ".core",
+    "mlflow_run": ".mlflow_utils",
+    "deps_path": ".config_utils",
+    "outs_path": ".config_utils",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        # Submodules (zendag.core, ...) stay reachable as attributes after `import zendag`
+        try:
+            return importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
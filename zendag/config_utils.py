@@ -10,8 +10,7 @@ _log = logging.getLogger(__name__)
 def outs_path(s: str, root_dir: bool = False) -> str:
     """Returns the formatted string for DVC outputs."""
 
-    base_dir = "."
-    return "${outs:" + base_dir + "/" + str(s) + "}"
+    return f"${{outs:./{s}}}"
     # base_dir = str(s) if root_dir else "${hydra:runtime.output_dir}" + "/" + str(s)
     # return "${outs:" + base_dir + "}"
 
@@ -33,10 +32,7 @@ def deps_path(
             raise ValueError("input_name must be specified if input_stage is provided.")
         if stage_dir_fn is None:
             raise ValueError("stage_dir_fn must be provided if input_stage/input_name are used.")
-        base_dir = stage_dir_fn(input_stage, input_name) + "/"
-        wdir = True
-    else:
-        base_dir = ""
-        wdir = False
 
-    return "${deps:" + base_dir + str(s) + "," + str(wdir) + "}"
+    if input_stage is not None:
+        return f"${{deps:{stage_dir_fn(input_stage, input_name)}/{s},True}}"
+    return f"${{deps:{s},False}}"
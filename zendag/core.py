@@ -1,17 +1,243 @@
+import functools
+import hashlib
+import importlib.util
+import json
 import logging
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import hydra
-from hydra.core.global_hydra import GlobalHydra
 import hydra_zen
+import yaml
+from hydra.core.config_store import ConfigStore
+from hydra.core.global_hydra import GlobalHydra
 from omegaconf import OmegaConf
 
+from zendag_hydra_conf import _ensure_symlink
+
+try:  # Prefer the LibYAML-backed dumper when PyYAML was built with it
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # pragma: no cover
+    from yaml import SafeDumper
+
+try:  # Private OmegaConf API, lets a resolved container be dumped without rebuilding a config from it
+    from omegaconf._utils import get_omega_conf_dumper
+except ImportError:  # pragma: no cover
+    get_omega_conf_dumper = None
+
+# Bound once: dvc.yaml only holds plain data and goes through the same safe dumper settings
+_dump_yaml = functools.partial(yaml.dump, Dumper=SafeDumper, sort_keys=False)
+
 _log = logging.getLogger(__name__)
 
 ARTIFACTS_ROOT = os.getenv("ARTIFACTS_DIR", "workbench")  # Default to "workbench"
 
+# Resolved configs (and the deps/outs they produced) keyed by a hash of the unresolved
+# config and of the context the zendag resolvers depend on. Lets repeated
+# configure_pipeline calls in one process (notebooks, tests) skip re-resolution.
+_RESOLUTION_CACHE: Dict[bytes, Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = {}
+_RESOLUTION_CACHE_SIZE = 256
+_RESOLVER_CALL_RE = re.compile(r"\$\{\s*([\w.]+)\s*:")
+_CACHEABLE_RESOLVERS = {"outs", "deps"}
+_EMPTY_DVC_YAML = b"stages: {}\n"
+# Composed configs (and their deps/outs) persisted across processes, under the working directory
+_COMPOSE_CACHE_DIRNAME = ".zendag_cache"
+
+
+def _resolution_cache_key(cfg, *context) -> Optional[bytes]:
+    """Hashes an unresolved config with its resolution context, None if not cacheable.
+
+    Configs using resolvers other than `outs`/`deps` (e.g. `oc.env`) may resolve
+    differently from one call to the next and are never cached.
+    """
+    unresolved = OmegaConf.to_yaml(cfg, resolve=False)
+    if any(r not in _CACHEABLE_RESOLVERS for r in _RESOLVER_CALL_RE.findall(unresolved)):
+        return None
+    key = hashlib.blake2b(unresolved.encode(), digest_size=16)
+    for c in context:
+        key.update(b"\0" + str(c).encode())
+    return key.digest()
+
+
+def _search_path_dir(path: str) -> Optional[str]:
+    """Local directory behind a Hydra `file://` or `pkg://` search path entry, if any."""
+    if path.startswith("file://"):
+        return path[len("file://") :]
+    if path.startswith("pkg://"):
+        try:
+            spec = importlib.util.find_spec(path[len("pkg://") :].replace("/", "."))
+        except (ImportError, ValueError):
+            return None
+        if spec is not None and spec.submodule_search_locations:
+            return list(spec.submodule_search_locations)[0]
+    return None
+
+
+def _config_sources_digest() -> Optional[bytes]:
+    """Hashes what composition reads: every node in Hydra's ConfigStore and the YAML files on its search path.
+
+    The ConfigStore holds the entries of the store passed to configure_pipeline (added
+    before this is called) as well as nodes stored there by any other means. Returns
+    None when a node cannot be serialized, which disables the on-disk compose cache
+    for the call.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    pending = [("", ConfigStore.instance().repo)]
+    try:
+        while pending:
+            prefix, repo = pending.pop()
+            for key in sorted(repo):
+                value = repo[key]
+                if isinstance(value, dict):
+                    pending.append((f"{prefix}{key}/", value))
+                    continue
+                digest.update(f"\0{prefix}{key}\0{value.package}\0".encode())
+                digest.update(OmegaConf.to_yaml(value.node).encode())
+    except Exception:
+        return None
+    for element in GlobalHydra.instance().config_loader().get_search_path().get_path():
+        digest.update(f"\0{element.path}".encode())
+        root = _search_path_dir(element.path)
+        if root is None or not os.path.isdir(root):
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith((".yaml", ".yml")):
+                    file_path = os.path.join(dirpath, filename)
+                    digest.update(f"\0{file_path}\0{os.stat(file_path).st_mtime_ns}".encode())
+    return digest.digest()
+
+
+class _ComposeCache:
+    """Composed stage configs (and their deps/outs) persisted under `<wdir>/.zendag_cache` across calls.
+
+    Each stage instance has a single JSON entry holding the key it was stored for, so
+    an entry is overwritten rather than piling up when its key changes. A None
+    `sources_digest` disables the cache.
+    """
+
+    def __init__(self, wdir, sources_digest: Optional[bytes]):
+        self.cache_dir = os.path.join(str(wdir), _COMPOSE_CACHE_DIRNAME)
+        self.context = b"\0".join(str(c).encode() for c in (wdir, os.getcwd()))
+        self.sources_digest = sources_digest
+
+    def _entry(self, stage: Optional[str], name: str, hydra_run_dir: str) -> Tuple[str, str]:
+        """Path and key of a stage instance entry."""
+        entry_id = hashlib.blake2b(f"{stage}\0{name}".encode(), digest_size=16).hexdigest()
+        key = hashlib.blake2b(self.sources_digest, digest_size=16)
+        key.update(f"\0{entry_id}\0{hydra_run_dir}\0".encode() + self.context)
+        return os.path.join(self.cache_dir, entry_id + ".json"), key.hexdigest()
+
+    def compose(self, stage: Optional[str], name: str, hydra_run_dir: str, compose_stage):
+        """Returns `(composed_yaml, deps, outs)` from the entry if still valid, else from `compose_stage`.
+
+        Only results `compose_stage` flags as freshly resolved and cacheable are persisted.
+        """
+        if self.sources_digest is None:
+            composed = compose_stage(stage, name, hydra_run_dir)
+            return None if composed is None else composed[:3]
+        path, key = self._entry(stage, name, hydra_run_dir)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if entry["key"] == key:
+                _log.debug(f"  Reusing persisted composition for '{stage}/{name}'.")
+                return entry["yaml"], list(entry["deps"]), list(entry["outs"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # Missing or unreadable entry: compose
+        composed = compose_stage(stage, name, hydra_run_dir)
+        if composed is None:
+            return None
+        composed_yaml, deps, outs, persist = composed
+        if persist:
+            self._store(path, {"key": key, "yaml": composed_yaml, "deps": deps, "outs": outs})
+        return composed_yaml, deps, outs
+
+    def _store(self, path: str, entry: dict) -> None:
+        """Writes an entry atomically; a failure only costs a later cache miss."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # wdir usually holds the composed params files committed to git, keep the cache out of it
+                with open(os.path.join(self.cache_dir, ".gitignore"), "w") as f:
+                    f.write("# Created by zendag automatically.\n*\n")
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            _log.debug(f"  Could not persist compose cache entry {path}. Error: {e}")
+
+
+class _ResolverCtx:
+    """State behind the `outs`/`deps` resolvers: the stage being resolved and the paths it declared."""
+
+    def __init__(self, wdir_p: Callable[..., str]):
+        self.wdir_p = wdir_p
+        self.deps: List[str] = []
+        self.outs: List[str] = []
+        self.hydra_run_dir = ""
+
+    def reset(self, hydra_run_dir: str) -> None:
+        """Points the resolvers at a new stage instance."""
+        self.deps.clear()
+        self.outs.clear()
+        self.hydra_run_dir = hydra_run_dir
+
+    def outs_resolver(self, k: str) -> str:
+        self.outs.append(self.hydra_run_dir + "/" + k)
+        return k
+
+    def deps_resolver(self, k: str, w) -> str:
+        path = self.wdir_p(k, w)
+        self.deps.append(path)
+        return path
+
+
+def _write_text(item: Tuple[str, Path, str]) -> Optional[Exception]:
+    """Writes one pending composed config, returning the error instead of raising it.
+
+    A file already holding the same content is left untouched, so its mtime does
+    not change and DVC does not need to re-hash it.
+    """
+    _, path, text = item
+    data = text.encode("utf-8")
+    try:
+        try:
+            if os.stat(path).st_size == len(data) and path.read_bytes() == data:
+                return None
+        except OSError:
+            pass  # Missing (or unreadable) file: write it
+        path.write_bytes(data)
+    except Exception as e:
+        return e
+    return None
+
+
+def _dump_composed_config(cfg, container=None) -> str:
+    """Serializes a composed stage config to YAML.
+
+    `container` is the resolved plain-data form of `cfg` when the caller already has
+    it (otherwise `cfg` is converted as is). It is emitted like OmegaConf.to_yaml, with
+    OmegaConf's dumper, so that strings its loader would read as another type (e.g.
+    "1e-3") stay quoted when Hydra loads the file back.
+    """
+    if container is None:
+        container = OmegaConf.to_container(cfg, resolve=False, enum_to_str=True)
+    if get_omega_conf_dumper is None:
+        return OmegaConf.to_yaml(OmegaConf.create(container))
+    return yaml.dump(
+        container,
+        default_flow_style=False,
+        allow_unicode=True,
+        sort_keys=False,
+        Dumper=get_omega_conf_dumper(),
+    )
+
 
 # Default stage dir function, can be overridden
 def default_stage_dir_fn(stage: str | None, name: str) -> str:
@@ -41,6 +267,7 @@ def configure_pipeline(
     wdir=None,
     dvc_stage_name_fn: Callable | None = None,
     dry: bool = False,
+    compose_cache: bool = True,
 ) -> dict[str, Path]:
     """
     Configures the DVC pipeline based on Hydra-Zen stored configurations.
@@ -66,13 +293,19 @@ def configure_pipeline(
         run_script: The Python module path to execute for running a stage (e.g., 'my_project.run').
                     Defaults to 'zendag.run'.
         config_root: The path relative to which Hydra should initialize (defaults to cwd).
-                     Needed if configs are stored outside the cwd.
+                     Needed if configs are stored outside the cwd. When omitted and Hydra
+                     is already initialized, the existing instance is reused.
+        compose_cache: Reuse the composed configs persisted under `<wdir>/.zendag_cache`
+                       (one file per stage instance) for stages whose ConfigStore nodes,
+                       Hydra config files and paths are unchanged, skipping their Hydra
+                       composition. Defaults to True.
     """
 
     dvc_stages: Dict[str, Dict[str, Any]] = {}
     all_deps: Dict[Tuple[str, str], List[str]] = {}
     all_outs: Dict[Tuple[str, str], List[str]] = {}
     stage_config_paths: Dict[str, Path] = {}
+    pending_writes: List[Tuple[str, Path, str]] = []
 
     if store is None:
         store = hydra_zen.store
@@ -86,28 +319,37 @@ def configure_pipeline(
     if wdir is None:
         wdir = stage_dir_fn(None, "")
 
-    Path(wdir).mkdir(exist_ok=True, parents=True)  # Ensure the working directory exists
-    if not (Path(wdir) / "projroot").exists():
-        os.symlink(
-            Path(*([".."] * len(Path(wdir).parts))), Path(wdir) / "projroot", target_is_directory=True
-        )  # Link projroot to working directory
+    if not os.path.isdir(wdir):
+        Path(wdir).mkdir(exist_ok=True, parents=True)  # Ensure the working directory exists
+    # Link projroot to working directory, replacing a stale or dangling link from a previous layout
+    _ensure_symlink(str(Path(*([".."] * len(Path(wdir).parts)))), Path(wdir) / "projroot")
+
+    # Resolved once instead of on every wdir_p call
+    cwd = os.getcwd()
+    wdir_abs = os.path.abspath(wdir)
 
+    @functools.lru_cache(maxsize=2048)  # Called by the deps resolver for every dependency
     def wdir_p(p, w=True, lk="projroot"):
         if w:
             if wdir is None:
                 return p
-            return str(Path(p).absolute().relative_to(Path(wdir).absolute()))
+            return os.path.relpath(os.path.join(cwd, p), wdir_abs)
         return lk + "/" + str(p)
 
-    _log.info("Initializing Hydra (version_base=1.3) for configuration composition.")
-    # Initialize Hydra once if needed, respecting config_root
-
-    if GlobalHydra.instance().is_initialized():
-        GlobalHydra.instance().clear()
-    if config_root:
-        hydra.initialize(version_base="1.3", config_path=config_root)
+    # Initialize Hydra once if needed, respecting config_root.
+    # An instance initialized by the caller is reused (and left initialized) unless a
+    # specific config_root is requested.
+    owns_hydra = bool(config_root) or not GlobalHydra.instance().is_initialized()
+    if owns_hydra:
+        _log.info("Initializing Hydra (version_base=1.3) for configuration composition.")
+        if GlobalHydra.instance().is_initialized():
+            GlobalHydra.instance().clear()
+        if config_root:
+            hydra.initialize(version_base="1.3", config_path=config_root)
+        else:
+            hydra.initialize(version_base="1.3")
     else:
-        hydra.initialize(version_base="1.3")
+        _log.info("Reusing the already initialized Hydra instance for configuration composition.")
 
     try:
         store.add_to_hydra_store(overwrite_ok=True)
@@ -120,6 +362,89 @@ def configure_pipeline(
         raise e
     _log.info(f"Processing stage groups: {stage_groups}")
 
+    # Resolvers are registered once per call; they have side-effects (appending to the
+    # lists of the stage being resolved) and compose_stage resets resolver_ctx per stage.
+    # use_cache: repeated identical interpolations within a config are resolved once
+    resolver_ctx = _ResolverCtx(wdir_p)
+    OmegaConf.register_new_resolver("outs", resolver_ctx.outs_resolver, replace=True, use_cache=True)
+    OmegaConf.register_new_resolver("deps", resolver_ctx.deps_resolver, replace=True, use_cache=True)
+
+    def compose_stage(stage, name, hydra_run_dir) -> Optional[Tuple[str, List[str], List[str], bool]]:
+        """Composes and resolves one stage config.
+
+        Returns `(composed_yaml, deps, outs, persist)`, or None if the stage has to be skipped.
+        `persist` is True when the config was resolved by this call and is safe to reuse.
+        """
+        # 1. Compose the configuration
+        try:
+            if stage is None:
+                root_cfg = cfg = hydra.compose(name)
+            else:
+                root_cfg = hydra.compose(overrides=[f"+{stage}={name}"])
+                cfg = OmegaConf.select(root_cfg, stage)
+            _log.debug(f"  Successfully composed configuration for '{stage}/{name}'.")
+        except Exception as e:
+            _log.error(
+                f"  Failed to compose configuration for '{stage}/{name}'. Error: {e}",
+                exc_info=True,
+            )
+            return None
+
+        # 3. Resolve config to discover deps/outs via side-effects
+        # Point the resolvers registered above at this stage instance
+        resolver_ctx.reset(hydra_run_dir)
+        current_deps, current_outs = resolver_ctx.deps, resolver_ctx.outs
+
+        composed_yaml: Optional[str] = None
+        container = None
+        # The stage node may interpolate anything in the composed root, so the whole root is hashed
+        cache_key = _resolution_cache_key(root_cfg, stage, hydra_run_dir, wdir, os.getcwd())
+        cached = _RESOLUTION_CACHE.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            composed_yaml, deps, outs = cached[0], list(cached[1]), list(cached[2])
+            _log.debug(f"  Reusing cached resolution for '{stage}/{name}'.")
+        else:
+            _log.debug(f"  Resolving configuration for '{stage}/{name}' to discover dependencies and outputs...")
+            try:
+                # Resolves and materializes the config in a single traversal
+                container = OmegaConf.to_container(cfg, resolve=True, enum_to_str=True)
+                # Make unique and sort for consistency (stable dvc.yaml diffs)
+                deps = sorted(set(current_deps))
+                outs = sorted(set(current_outs))
+                _log.info(f"    Discovered Deps: {deps}")
+                _log.info(f"    Discovered Outs: {outs}")
+            except Exception as e:
+                _log.error(
+                    f"  Failed during config resolution for '{stage}/{name}'. Check interpolations (esp. deps/outs). Error: {e}",
+                    exc_info=True,
+                )
+                # Store empty lists to avoid crashing later, but log error
+                deps, outs = [], []
+                cache_key = None  # Never cache a failed resolution
+
+        # 2. Serialize the composed config (for DVC params tracking), written after the stage loop
+        try:
+            if composed_yaml is None:
+                composed_yaml = _dump_composed_config(cfg, container)
+                if cache_key is not None:
+                    if len(_RESOLUTION_CACHE) >= _RESOLUTION_CACHE_SIZE:
+                        _RESOLUTION_CACHE.pop(next(iter(_RESOLUTION_CACHE)))
+                    _RESOLUTION_CACHE[cache_key] = (
+                        composed_yaml,
+                        tuple(deps),
+                        tuple(outs),
+                    )
+        except Exception as e:
+            _log.error(
+                f"  Failed to serialize composed configuration for '{stage}/{name}'. Error: {e}",
+                exc_info=True,
+            )
+            return None
+        # Configs relying on other resolvers (cache_key None) may compose differently next time
+        return composed_yaml, deps, outs, cache_key is not None and cached is None
+
+    disk_cache = _ComposeCache(wdir, _config_sources_digest() if compose_cache else None)
+
     for stage in stage_groups:
         cfg_dir = Path(configs_dir_fn(stage))
         cfg_dir.mkdir(exist_ok=True, parents=True)
@@ -132,91 +457,54 @@ def configure_pipeline(
 
         _log.info(f"Processing stage group '{stage}' with {len(stage_items)} configuration(s)...")
 
+        # Group-constant parts of the DVC entries, computed once instead of per config
+        wdir_cfg_dir = wdir_p(cfg_dir)
+        cmd_prefix = f"python -m {run_script} -cd {wdir_cfg_dir} -cn "
+
         for _, name in stage_items:
             stage_key = (stage, name)
             _log.info(f"  Processing configuration: '{name}'")
-
-            # 1. Compose the configuration
-            try:
-                if stage is None:
-                    cfg = hydra.compose(name)
-                else:
-                    cfg = hydra.compose(overrides=[f"+{stage}={name}"])
-                    cfg = OmegaConf.select(cfg, stage)
-                _log.debug(f"  Successfully composed configuration for '{stage}/{name}'.")
-            except Exception as e:
-                _log.error(
-                    f"  Failed to compose configuration for '{stage}/{name}'. Error: {e}",
-                    exc_info=True,
-                )
-                continue
-
-            # 3. Resolve config to discover deps/outs via side-effects
-            current_deps: List[str] = []
-            current_outs: List[str] = []
-
-            # IMPORTANT: Register resolvers *before* resolve call
-            # These resolvers have side-effects (appending to lists)
-
             hydra_run_dir = wdir_p(stage_dir_fn(stage, name))
-            OmegaConf.register_new_resolver(
-                "outs", lambda k: current_outs.append(hydra_run_dir + "/" + k) or k, replace=True
-            )
-
-            OmegaConf.register_new_resolver(
-                "deps", lambda k, w: current_deps.append(wdir_p(k, w)) or wdir_p(k, w), replace=True
-            )
-            # Hydra resolver needs the runtime context for the *specific* stage instance
-
-            _log.debug(f"  Resolving configuration for '{stage}/{name}' to discover dependencies and outputs...")
-            try:
-                OmegaConf.resolve(cfg)
-                # Make unique and sort for consistency
-                unique_deps = sorted(list(set(current_deps)))
-                unique_outs = sorted(list(set(current_outs)))
-                all_deps[stage_key] = unique_deps
-                all_outs[stage_key] = unique_outs
-                _log.info(f"    Discovered Deps: {unique_deps}")
-                _log.info(f"    Discovered Outs: {unique_outs}")
-            except Exception as e:
-                _log.error(
-                    f"  Failed during config resolution for '{stage}/{name}'. Check interpolations (esp. deps/outs). Error: {e}",
-                    exc_info=True,
-                )
-                # Store empty lists to avoid crashing later, but log error
-                all_deps[stage_key] = []
-                all_outs[stage_key] = []
-
-            # 2. Write the composed config (for DVC params tracking)
             composed_config_path = cfg_dir / f"{name}.yaml"
-            try:
-                composed_config_path.write_text(hydra_zen.to_yaml(cfg))
-                _log.debug(f"  Wrote composed configuration to: {composed_config_path}")
-            except Exception as e:
-                _log.error(
-                    f"  Failed to write composed configuration to {composed_config_path}. Error: {e}",
-                    exc_info=True,
-                )
+
+            # Reuse the composition persisted by an earlier call if nothing it depends on changed
+            composed = disk_cache.compose(stage, name, hydra_run_dir, compose_stage)
+            if composed is None:
                 continue
+            composed_yaml, all_deps[stage_key], all_outs[stage_key] = composed
 
             # 4. Define DVC stage entry
             dvc_stage_name = dvc_stage_name_fn(stage, name)
+            pending_writes.append((dvc_stage_name, composed_config_path, composed_yaml))
             stage_config_paths[dvc_stage_name] = composed_config_path
             # Ensure the output directory path uses the function, not hardcoded 'workbench'
             dvc_stages[dvc_stage_name] = dict(
                 cmd=(
-                    f"python -m {run_script} "
-                    f"-cd {wdir_p(configs_dir_fn(stage))} -cn {name} "
-                    "+zendag=base "
-                    f"hydra.run.dir='{hydra_run_dir}'"  # Use quotes for safety
+                    f"{cmd_prefix}{name} +zendag=base hydra.run.dir='{hydra_run_dir}'"  # Use quotes for safety
                 ),
                 **(dict() if wdir is None else dict(wdir=wdir)),
                 deps=all_deps[stage_key],
                 outs=all_outs[stage_key],
-                params=[{f"{wdir_p(composed_config_path)}": None}],  # Use as_posix for consistency
+                params=[{os.path.normpath(os.path.join(wdir_cfg_dir, f"{name}.yaml")): None}],
             )
             _log.debug(f"  Defined DVC stage '{dvc_stage_name}'.")
 
+    # Compose/resolve above rely on Hydra's global state and process-wide resolvers and
+    # stay serial; the composed config writes are plain file I/O and run concurrently.
+    if pending_writes:
+        with ThreadPoolExecutor(max_workers=min(8, len(pending_writes))) as executor:
+            write_errors = list(executor.map(_write_text, pending_writes))
+        for (dvc_stage_name, composed_config_path, _), error in zip(pending_writes, write_errors):
+            if error is None:
+                _log.debug(f"  Wrote composed configuration to: {composed_config_path}")
+                continue
+            _log.error(
+                f"  Failed to write composed configuration to {composed_config_path}. Error: {error}",
+                exc_info=error,
+            )
+            dvc_stages.pop(dvc_stage_name, None)
+            stage_config_paths.pop(dvc_stage_name, None)
+
     # 5. Write dvc.yaml
     dvc_file = Path(dvc_filename)
     try:
@@ -225,11 +513,16 @@ def configure_pipeline(
         if manual_dvc is not None:
             OmegaConf.merge(dvc_data, manual_dvc)
 
-        # Convert DictConfig back to primitive types suitable for pyyaml dump if needed
-        # or use OmegaConf.save if hydra_zen.to_yaml doesn't handle it well (it should)
-        dvc_file.write_text(hydra_zen.to_yaml(dvc_data))  # hydra-zen's yaml dump is generally good
+        if not dvc_stages and manual_dvc is None:
+            # Nothing to serialize, skip the dumper entirely
+            dvc_file.write_bytes(_EMPTY_DVC_YAML)
+        else:
+            # dvc_data only holds plain python containers, dump it straight through (C)SafeDumper
+            with dvc_file.open("w") as f:
+                _dump_yaml(dvc_data, f)
         _log.info(f"Successfully wrote DVC pipeline configuration to: {dvc_file}")
     except Exception as e:
         _log.error(f"Failed to write DVC pipeline file {dvc_file}. Error: {e}", exc_info=True)
-    GlobalHydra.instance().clear()
+    if owns_hydra:
+        GlobalHydra.instance().clear()
     return stage_config_paths
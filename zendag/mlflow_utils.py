@@ -1,11 +1,10 @@
+import functools
+import json
 import logging
 import os
 from functools import wraps
-from pathlib import Path
 
 import hydra  # To access Hydra's runtime config
-import mlflow
-import pandas as pd
 from omegaconf import OmegaConf
 from .core import default_configs_dir_fn, default_stage_dir_fn
 
@@ -14,6 +13,62 @@ _log = logging.getLogger(__name__)
 
 ARTIFACTS_ROOT = os.getenv("ARTIFACTS_DIR", "artifacts")  # Default to "artifacts"
 
+# Imported on the first decorated call: importing mlflow takes about a second, which
+# modules that only import decorated stage functions (e.g. to build the store) never need
+mlflow = None
+
+# Experiment last passed to mlflow.set_experiment by this process; each call is a tracking-server request
+_CURRENT_EXPERIMENT = None
+
+
+def _import_mlflow():
+    global mlflow
+    if mlflow is None:
+        import mlflow as _mlflow
+
+        mlflow = _mlflow
+    return mlflow
+
+
+def _flatten(d, prefix=""):
+    """Yield `(dotted.key, value)` pairs for the leaves of a nested dict.
+
+    Lists are JSON-encoded: MLflow stores params as strings anyway, and JSON keeps them parseable.
+    """
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else str(k)
+        if isinstance(v, dict):
+            yield from _flatten(v, key)
+        elif isinstance(v, list):
+            yield key, json.dumps(v, default=str)
+        else:
+            yield key, v
+
+
+@functools.lru_cache(maxsize=256)
+def _load_params_cached(path: str, size: int, mtime_ns: int):
+    # Keyed on the file version: loaded, resolved and flattened once per process
+    return dict(_flatten(OmegaConf.to_container(OmegaConf.load(path), resolve=True)))
+
+
+def _load_params(config_path: str):
+    """Flattened, resolved params of a stage config, cached on (path, size, mtime)."""
+    st = os.stat(config_path)
+    return _load_params_cached(config_path, st.st_size, st.st_mtime_ns)
+
+
+def _log_run_log(mlflow, log_path: str, outcome: str) -> None:
+    """Logs a non-empty run.log, flushing the logging handlers (e.g. Hydra's job log file) first."""
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+    try:
+        size = os.stat(log_path).st_size
+    except FileNotFoundError:
+        return
+    if size:
+        _log.info(f"Logging run log on {outcome}: {log_path}")
+        mlflow.log_artifact(log_path)
+
 
 def mlflow_run(
     project_name=os.environ.get("MLFLOW_PROJECT_NAME", "DefaultProject"),
@@ -34,10 +89,18 @@ def mlflow_run(
     def decorator(wrapped_function):
         @wraps(wrapped_function)
         def wrapper(*args, **kwargs):
+            mlflow = _import_mlflow()
             parent_run_id = None
-            pipeline_id_file = Path(".pipeline_id")
-            if pipeline_id_file.exists():
-                parent_run_id = pipeline_id_file.read_text().strip()
+            pipeline_id_file = ".pipeline_id"
+            try:
+                fd = os.open(pipeline_id_file, os.O_RDONLY)
+            except FileNotFoundError:
+                pass
+            else:
+                try:
+                    parent_run_id = os.read(fd, 256).decode().strip()  # A run ID is 32 hex characters
+                finally:
+                    os.close(fd)
                 os.environ["MLFLOW_RUN_ID"] = parent_run_id
                 _log.info(f"Found parent run ID in .pipeline_id: {parent_run_id}")
             current_mlflow_project_name = project_name
@@ -45,12 +108,21 @@ def mlflow_run(
                 _log.warning("MLFLOW_PROJECT_NAME not set. Using 'DefaultProject'.")
                 current_mlflow_project_name = "DefaultZenDagProject"
             # TODO check if pipeline id exists in project
-            mlflow.set_experiment(current_mlflow_project_name)
+            global _CURRENT_EXPERIMENT
+            if _CURRENT_EXPERIMENT != current_mlflow_project_name:
+                mlflow.set_experiment(current_mlflow_project_name)
+                _CURRENT_EXPERIMENT = current_mlflow_project_name
             _log.info(f"Using MLflow experiment: '{current_mlflow_project_name}'")
 
             # DVC sets this environment variable during `dvc repro` or `dvc exp run`
             dvc_stage_name = os.environ.get("DVC_STAGE")  # e.g., "training/train-interburst"
             run_name = dvc_stage_name or wrapped_function.__name__
+            # Parsed once: "<stage>/<config_name>", or just "<config_name>" for stages without a group
+            stage, config_name, log_path = None, None, None
+            if dvc_stage_name:
+                head, sep, tail = dvc_stage_name.partition("/")
+                stage, config_name = (head, tail) if sep else (None, head)
+                log_path = f"{stage_dir_fn(stage, config_name)}/run.log"
 
             try:
                 # Start the parent run context (or reuse if ID exists)
@@ -58,7 +130,11 @@ def mlflow_run(
                     _log.info(f"Active MLflow parent run ID: {parent_run.info.run_id}")
                     # Store the potentially *new* parent run ID if one wasn't provided
                     if not parent_run_id:
-                        pipeline_id_file.write_text(parent_run.info.run_id + "\n")
+                        fd = os.open(pipeline_id_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                        try:
+                            os.write(fd, (parent_run.info.run_id + "\n").encode())
+                        finally:
+                            os.close(fd)
                         _log.info(f"Wrote new parent run ID to .pipeline_id: {parent_run.info.run_id}")
 
                     # Start the nested child run for the specific stage/function
@@ -66,31 +142,22 @@ def mlflow_run(
                         _log.info(f"Started nested MLflow run '{run_name}' (ID: {child_run.info.run_id})")
 
                         # Log parameters and config artifact if running as a DVC stage
-                        hydra_cfg = None
                         if dvc_stage_name:
                             try:
                                 # Infer config path from dvc_stage_name and standard structure
-                                stage, config_name = dvc_stage_name.split("/", 1)
                                 # Use the same logic as configure_pipeline (needs access to configs_dir_fn)
                                 # Simplification: Assume standard 'artifacts/' structure for now
                                 # TODO: Make config path resolution more robust (maybe pass via env?)
-                                config_path = Path(configs_dir_fn(stage)) / f"{config_name}.yaml"
+                                config_path = f"{configs_dir_fn(stage)}/{config_name}.yaml"
 
-                                if config_path.exists():
+                                if os.path.exists(config_path):
                                     _log.info(f"Logging config from: {config_path}")
-                                    hydra_cfg = OmegaConf.load(config_path)
-                                    # Flatten the dictionary for MLflow params
-                                    params_flat = pd.json_normalize(
-                                        OmegaConf.to_container(
-                                            hydra_cfg, resolve=True
-                                        ),  # Resolve interpolations before logging
-                                        sep=".",
-                                    ).to_dict(orient="records")[0]
-                                    # Log parameters (MLflow truncates long values)
-                                    for k, v in params_flat.items():
-                                        mlflow.log_param(k, v)
+                                    # Flatten the dictionary for MLflow params, resolving interpolations
+                                    params_flat = _load_params(config_path)
+                                    # Log parameters in one batch (MLflow truncates long values)
+                                    mlflow.log_params(params_flat)
                                     # Log the config file itself
-                                    mlflow.log_artifact(config_path.as_posix())
+                                    mlflow.log_artifact(config_path)
                                 else:
                                     _log.warning(f"Config file not found at expected path: {config_path}")
                             except Exception as e:
@@ -103,9 +170,8 @@ def mlflow_run(
                             # This requires the decorated function to be the Hydra entry point
                             try:
                                 if hydra.core.hydra_config.HydraConfig.initialized():
-                                    hydra_cfg = hydra.core.hydra_config.HydraConfig.get()
                                     # Log runtime config params maybe? Careful, can be large.
-                                    # mlflow.log_params(OmegaConf.to_container(hydra_cfg.runtime, resolve=True))
+                                    # mlflow.log_params(OmegaConf.to_container(HydraConfig.get().runtime, resolve=True))
                                     _log.info("Running outside DVC context, Hydra config might be available.")
                                 else:
                                     _log.info("Running outside DVC and Hydra context.")
@@ -122,17 +188,13 @@ def mlflow_run(
                         except Exception as e:
                             _log.exception(f"Execution failed for '{run_name}'.")
                             # Log run.log artifact even on failure
-                            log_path = Path(stage_dir_fn(stage, config_name)) / "run.log"
-                            if log_path and log_path.exists():
-                                _log.info(f"Logging run log on failure: {log_path}")
-                                mlflow.log_artifact(log_path.as_posix())
+                            if log_path is not None:
+                                _log_run_log(mlflow, log_path, "failure")
                             raise e  # Re-raise the exception
 
                         # Log run.log artifact on success
-                        log_path = Path(stage_dir_fn(stage, config_name)) / "run.log"
-                        if log_path and log_path.exists():
-                            _log.info(f"Logging run log on success: {log_path}")
-                            mlflow.log_artifact(log_path.as_posix())
+                        if log_path is not None:
+                            _log_run_log(mlflow, log_path, "success")
 
                         return result  # Return the function's result
 
@@ -2,13 +2,27 @@ from pathlib import Path
 
 import hydra_zen
 import mlflow
+import yaml
+
+try:  # Prefer the LibYAML-backed loader when PyYAML was built with it
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader
+
+# MLflow rejects longer param values (the limit is 500 characters in older versions)
+_MAX_PARAM_LENGTH = 500
 
 
 def start_pipeline(run_name, project_name, dvc_root):
+    dvc_yaml = Path(dvc_root) / "dvc.yaml"
     mlflow.set_experiment(project_name)
     with mlflow.start_run(run_name=run_name):
         Path(".pipeline_id").write_text(mlflow.active_run().info.run_id)
-        mlflow.log_artifact(Path(dvc_root) / "dvc.yaml")
+        mlflow.log_artifact(dvc_yaml)
+        with dvc_yaml.open("rb") as f:
+            stages = list((yaml.load(f, Loader=SafeLoader) or {}).get("stages") or {})
+        # Manifest summary to filter pipeline runs on, logged in a single batch
+        mlflow.log_params({"n_stages": len(stages), "stages": ",".join(stages)[:_MAX_PARAM_LENGTH]})
 
 
 if __name__ == "__main__":
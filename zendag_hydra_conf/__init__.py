@@ -5,38 +5,52 @@ from pathlib import Path
 
 _log = logging.getLogger(__name__)
 
-def get_original_root(targets=['pyproject.toml', '.git'], relative=True) -> Path:
+def get_original_root(targets=('pyproject.toml', '.git'), relative=True) -> Path:
     """
     Return the root directory of the project.
     Find the first parent directory that contains one of the targets passed as input.
     If relative is True, return the path relative to the current working directory (number of ..).
     """
-    current_dir = Path.cwd().resolve()
-    for parent in [current_dir] + list(current_dir.parents):
+    current_dir = os.path.realpath(os.getcwd())
+    # Walk up one directory at a time with plain string paths, stopping at the first match
+    parent, depth = current_dir, 0
+    while True:
         for target in targets:
-            if (parent / target).exists():
+            if os.path.exists(os.path.join(parent, target)):
                 if relative:
-                    # If relative is True, determine the depth of the current directory relative to the parent
-                    depth = len(current_dir.relative_to(parent).parts)
+                    # If relative is True, the depth of the current directory below the parent gives the number of ..
                     return Path(*(['..'] * depth))
                 else:
-                    return parent
+                    return Path(parent)
+        next_parent = os.path.dirname(parent)
+        if next_parent == parent:
+            break
+        parent, depth = next_parent, depth + 1
     raise FileNotFoundError(f"None of the targets {targets} found in {current_dir} or its parents.")
 
-class LinkProjectRoot(Callback):
-    def on_job_start(self, *args, **kwargs):
-        import os
+def _ensure_symlink(target, link) -> bool:
+    """
+    Make `link` a symlink to `target`, atomically replacing a stale or dangling one.
+    Returns False when nothing had to change (or `link` is a real file/directory, left untouched).
+    """
+    try:
+        if os.readlink(link) == os.fspath(target):
+            return False
+    except FileNotFoundError:
+        pass
+    except OSError:  # Not a symlink
+        return False
+    tmp = f"{link}.tmp.{os.getpid()}"
+    os.symlink(target, tmp, target_is_directory=True)
+    os.replace(tmp, link)
+    return True
 
-        if  Path('projroot').exists():
-            _log.info(f"Symlink exists doing nothing")
-            return
 
+class LinkProjectRoot(Callback):
+    def on_job_start(self, *args, **kwargs):
         proj_root = get_original_root()
-
-        _log.info(f"Linking projroot to {proj_root} wich resolves to {os.path.abspath(proj_root)}")
-        os.symlink(proj_root, 'projroot', target_is_directory=True)
-        
-
+        if _ensure_symlink(proj_root, 'projroot'):
+            _log.info(f"Linked projroot to {proj_root} which resolves to {os.path.abspath(proj_root)}")
 
 
 class BasicLogging(Callback):